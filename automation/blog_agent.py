@@ -4,12 +4,19 @@ Generates SEO-optimized, internally-linked blog posts using OpenAI.
 Posts include links to site pages, other blog posts, and practical
 problem-solving content that drives traffic and conversions.
 
+Drafts are generated ahead of the schedule into a buffer (draft_queue.json)
+during off-peak hours, so a scheduled slot only has to promote the next
+ready draft — no OpenAI call on the publishing path. If the buffer is empty
+the agent falls back to generating a post live.
+
 Usage:
     python blog_agent.py          # Run as persistent scheduler (2x daily)
-    python blog_agent.py --now    # Generate one post immediately
+    python blog_agent.py --now    # Publish one post immediately
+    python blog_agent.py --refill # Top up the draft buffer and exit
 """
 
 import argparse
+import hashlib
 import json
 import logging
 import os
@@ -45,6 +52,7 @@ PROJECT_DIR = SCRIPT_DIR.parent
 CONFIG_PATH = SCRIPT_DIR / "config.json"
 TEMPLATE_PATH = SCRIPT_DIR / "post_template.html"
 TRACKER_PATH = SCRIPT_DIR / "generated_posts.json"
+DRAFTS_PATH = SCRIPT_DIR / "draft_queue.json"
 BLOG_HTML_PATH = PROJECT_DIR / "blog.html"
 POSTS_DIR = PROJECT_DIR / "posts"
 
@@ -142,6 +150,32 @@ SITE_PAGES = {
     },
 }
 
+# --- Category planning for pre-generated drafts ---
+CATEGORIES = [
+    "Trenchless Technology",
+    "Sewer Lines",
+    "Drain Cleaning",
+    "Water Heaters",
+    "Gas Lines",
+    "Emergency Tips",
+    "Plumbing Tips",
+    "Home Maintenance",
+    "Repiping",
+    "DIY & Prevention",
+    "Our Services",
+    "Company News",
+]
+
+# Recent posts considered when looking for under-represented categories
+CATEGORY_HISTORY = 24
+
+# Config keys that shape generated content. A draft built under different
+# values is stale and gets discarded. Drafts are rendered into the template
+# at promotion, so template changes apply to queued drafts as they are.
+DRAFT_CONFIG_KEYS = ["openai_model", "site_name", "site_phone", "site_location"]
+
+REQUIRED_FIELDS = ["title", "meta_description", "excerpt", "category", "content"]
+
 
 def load_config():
     """Load configuration from config.json."""
@@ -169,16 +203,57 @@ def load_template():
         return f.read()
 
 
+def load_drafts():
+    """Load the pre-generated draft queue."""
+    if not DRAFTS_PATH.exists():
+        return []
+    with open(DRAFTS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_drafts(drafts):
+    """Save the pre-generated draft queue."""
+    with open(DRAFTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(drafts, f, indent=2, ensure_ascii=False)
+
+
+def draft_fingerprint(config):
+    """Hash the content-related config a draft is built with."""
+    relevant = {key: config.get(key) for key in DRAFT_CONFIG_KEYS}
+    payload = json.dumps(relevant, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
 def posts_generated_today(tracker):
     """Count how many posts were generated today."""
     today = date.today().isoformat()
     return sum(1 for entry in tracker if entry.get("date") == today)
 
 
-def pick_topic(config, tracker):
-    """Pick a topic that hasn't been used yet. Returns None if all used."""
-    used_slugs = {entry["slug"] for entry in tracker}
-    used_topics = {entry.get("topic", "") for entry in tracker}
+def category_counts(tracker, drafts=()):
+    """Count the stored categories of queued drafts and recent posts."""
+    counts = {category: 0 for category in CATEGORIES}
+    for draft in drafts:
+        category = draft.get("category", "")
+        counts[category] = counts.get(category, 0) + 1
+    for entry in tracker[:CATEGORY_HISTORY]:
+        category = entry.get("category", "")
+        counts[category] = counts.get(category, 0) + 1
+    return counts
+
+
+def plan_category(tracker, drafts=()):
+    """Pick the category least represented among recent posts and queued drafts."""
+    counts = category_counts(tracker, drafts)
+    fewest = min(counts[category] for category in CATEGORIES)
+    return random.choice([c for c in CATEGORIES if counts[c] == fewest])
+
+
+def pick_topic(config, tracker, drafts=()):
+    """Pick a topic that hasn't been used or queued yet. Returns None if all used."""
+    entries = list(drafts) + list(tracker)
+    used_slugs = {entry["slug"] for entry in entries}
+    used_topics = {entry.get("topic", "") for entry in entries}
 
     available = [
         t for t in config["topics"]
@@ -226,12 +301,13 @@ def build_internal_links_context(existing_posts):
     return links_section
 
 
-def generate_fresh_topic(client, config, tracker):
-    """Ask OpenAI to generate a fresh plumbing blog topic."""
+def generate_fresh_topic(client, config, tracker, category=None):
+    """Ask OpenAI to generate a fresh plumbing blog topic, optionally within a category."""
     logger.info("All predefined topics used. Asking AI for a fresh topic...")
 
     used_topics = [entry.get("topic", "") for entry in tracker[:30]]
     used_list = "\n".join(f"- {t}" for t in used_topics) if used_topics else "None yet"
+    category_hint = f" The topic should fall under the \"{category}\" category." if category else ""
 
     response = client.chat.completions.create(
         model=config["openai_model"],
@@ -253,7 +329,7 @@ def generate_fresh_topic(client, config, tracker):
             },
             {
                 "role": "user",
-                "content": f"Generate ONE unique plumbing blog topic. It must NOT overlap with these already-used topics:\n{used_list}\n\nReturn ONLY the topic title, nothing else.",
+                "content": f"Generate ONE unique plumbing blog topic.{category_hint} It must NOT overlap with these already-used topics:\n{used_list}\n\nReturn ONLY the topic title, nothing else.",
             },
         ],
         temperature=0.9,
@@ -262,10 +338,17 @@ def generate_fresh_topic(client, config, tracker):
     return response.choices[0].message.content.strip().strip('"')
 
 
-def generate_blog_content(client, config, topic, existing_posts):
-    """Generate blog content via OpenAI API with internal linking and SEO optimization."""
+def generate_blog_content(client, config, topic, existing_posts, category=None):
+    """Generate blog content via OpenAI API with internal linking and SEO optimization.
+
+    If a category is given, the post is required to use it.
+    """
 
     internal_links_context = build_internal_links_context(existing_posts)
+    if category:
+        category_field = f"Exactly this category: {category}"
+    else:
+        category_field = f"One category: {' | '.join(CATEGORIES)}"
 
     prompt = f"""Write a high-quality, SEO-optimized blog post for "{config['site_name']}" — a licensed plumbing company in {config['site_location']} serving the entire Bay Area.
 
@@ -286,7 +369,7 @@ Return your response as valid JSON with these exact keys:
     "meta_description": "Compelling meta description with keyword and CTA (under 155 characters)",
     "keywords": "comma-separated long-tail SEO keywords (6-10 keywords targeting what people search)",
     "excerpt": "2-sentence hook for the blog card — make the reader NEED to click",
-    "category": "One category: Trenchless Technology | Sewer Lines | Drain Cleaning | Water Heaters | Gas Lines | Emergency Tips | Plumbing Tips | Home Maintenance | Repiping | DIY & Prevention | Our Services | Company News",
+    "category": "{category_field}",
     "content": "The full blog post body as HTML markup (see requirements below)"
 }}
 
@@ -357,7 +440,10 @@ SEO:
     )
 
     raw = response.choices[0].message.content.strip()
-    return json.loads(raw)
+    data = json.loads(raw)
+    if category:
+        data["category"] = category
+    return data
 
 
 def estimate_reading_time(html_content):
@@ -482,6 +568,8 @@ def git_commit_and_push(slug, title):
             str(BLOG_HTML_PATH),
             str(TRACKER_PATH),
         ]
+        if DRAFTS_PATH.exists():
+            files_to_stage.append(str(DRAFTS_PATH))
         for filepath in files_to_stage:
             subprocess.run(
                 ["git", "add", filepath],
@@ -525,76 +613,67 @@ def git_commit_and_push(slug, title):
         return False
 
 
-def generate_post():
-    """Main function: pick topic, generate content, create files, update blog, commit."""
-    logger.info("=" * 60)
-    logger.info("Starting blog post generation...")
-
-    config = load_config()
-    tracker = load_tracker()
-    template = load_template()
+def validate_post_data(data, tracker, drafts=()):
+    """Check generated content is complete and its slug is unused. Returns the slug or None."""
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            logger.error(f"Generated content missing required field: {field}")
+            return None
 
-    # Check daily limit (2 posts per day)
-    max_daily = config.get("posts_per_day", 2)
-    today_count = posts_generated_today(tracker)
-    if today_count >= max_daily:
-        logger.info(f"Already generated {today_count}/{max_daily} posts today. Skipping.")
-        return
+    # Verify internal links are present
+    link_count = data["content"].count('href="../')
+    if link_count < 2:
+        logger.warning(f"Only {link_count} internal links found. Post may need more linking.")
 
-    # Initialize OpenAI client
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        logger.error("OPENAI_API_KEY environment variable not set.")
-        return
-    client = OpenAI(api_key=api_key)
+    # Check for duplicate slug
+    post_slug = slugify(data["title"])
+    if any(entry["slug"] == post_slug for entry in list(tracker) + list(drafts)):
+        logger.warning(f"Slug '{post_slug}' already exists. Skipping.")
+        return None
+    return post_slug
 
-    # Pick a topic
-    topic = pick_topic(config, tracker)
-    if topic is None:
-        topic = generate_fresh_topic(client, config, tracker)
-    logger.info(f"Selected topic: {topic}")
 
+def write_post(client, config, tracker, drafts=()):
+    """Pick a topic and generate validated post content. Returns (topic, slug, data) or None."""
     # Get existing posts for cross-linking
     existing_posts = get_existing_blog_posts(tracker)
 
-    # Generate content
+    # Pick a topic and generate content
     try:
-        data = generate_blog_content(client, config, topic, existing_posts)
+        category = None
+        topic = pick_topic(config, tracker, drafts)
+        if topic is None:
+            category = plan_category(tracker, drafts)
+            logger.info(f"Planning fresh topic for category: {category}")
+            topic = generate_fresh_topic(client, config, list(drafts) + list(tracker), category)
+        logger.info(f"Selected topic: {topic}")
+        data = generate_blog_content(client, config, topic, existing_posts, category)
     except Exception as e:
         logger.error(f"Failed to generate blog content: {e}")
-        return
+        return None
 
-    # Validate required fields
-    required_fields = ["title", "meta_description", "excerpt", "category", "content"]
-    for field in required_fields:
-        if field not in data:
-            logger.error(f"Generated content missing required field: {field}")
-            return
+    post_slug = validate_post_data(data, tracker, drafts)
+    if post_slug is None:
+        return None
 
     logger.info(f"Generated post: {data['title']}")
+    return topic, post_slug, data
 
-    # Verify internal links are present
-    link_count = data["content"].count('href="../')
-    if link_count < 2:
-        logger.warning(f"Only {link_count} internal links found. Post may need more linking.")
-
-    # Create slug
-    post_slug = slugify(data["title"])
 
-    # Check for duplicate slug
-    if any(entry["slug"] == post_slug for entry in tracker):
-        logger.warning(f"Slug '{post_slug}' already exists. Skipping.")
-        return
+def publish_post(template, tracker, topic, post_slug, data):
+    """Render the post and add it to blog.html and the tracker. Returns True on success."""
+    link_count = data["content"].count('href="../')
 
     # Create the post HTML file
     post_html = create_post_html(template, data)
-    save_post_file(post_slug, post_html)
+    post_path = save_post_file(post_slug, post_html)
 
     # Build the blog card and update blog.html
     card_html = build_blog_card(post_slug, data)
     if not update_blog_html(card_html):
         logger.error("Failed to update blog.html")
-        return
+        post_path.unlink(missing_ok=True)
+        return False
 
     # Log to tracker
     tracker.insert(0, {
@@ -607,11 +686,124 @@ def generate_post():
     })
     save_tracker(tracker)
 
+    logger.info(f"Internal links found: {link_count}")
+    return True
+
+
+def prune_drafts(drafts, tracker, fingerprint):
+    """Drop drafts built with an old config or whose slug is already published."""
+    published = {entry["slug"] for entry in tracker}
+    kept = []
+    for draft in drafts:
+        if draft.get("fingerprint") != fingerprint:
+            logger.info(f"Discarding stale draft (config changed): {draft['slug']}")
+        elif draft["slug"] in published:
+            logger.info(f"Discarding draft already published: {draft['slug']}")
+        else:
+            kept.append(draft)
+    return kept
+
+
+def get_openai_client():
+    """Create the OpenAI client, or return None if no API key is configured."""
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        logger.error("OPENAI_API_KEY environment variable not set.")
+        return None
+    return OpenAI(api_key=api_key)
+
+
+def refill_drafts():
+    """Generate drafts ahead of the schedule until the buffer is full."""
+    logger.info("=" * 60)
+    logger.info("Refilling draft buffer...")
+
+    config = load_config()
+    tracker = load_tracker()
+    fingerprint = draft_fingerprint(config)
+
+    drafts = load_drafts()
+    pruned = prune_drafts(drafts, tracker, fingerprint)
+    if len(pruned) != len(drafts):
+        save_drafts(pruned)
+    drafts = pruned
+
+    depth = config.get("draft_buffer_depth", 4)
+    if len(drafts) >= depth:
+        logger.info(f"Draft buffer already full ({len(drafts)}/{depth}).")
+        return
+
+    client = get_openai_client()
+    if client is None:
+        return
+
+    # One attempt per missing slot so a failing API can't loop forever
+    for _ in range(depth - len(drafts)):
+        result = write_post(client, config, tracker, drafts)
+        if result is None:
+            continue
+        topic, post_slug, data = result
+        drafts.append({
+            "slug": post_slug,
+            "topic": topic,
+            "category": data["category"],
+            "fingerprint": fingerprint,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "data": data,
+        })
+        save_drafts(drafts)
+        logger.info(f"Draft queued: {post_slug} ({len(drafts)}/{depth})")
+
+    logger.info(f"Draft buffer: {len(drafts)}/{depth}")
+    logger.info("=" * 60)
+
+
+def generate_post():
+    """Main function: publish the next ready draft, or generate a post live if none is queued."""
+    logger.info("=" * 60)
+    logger.info("Starting blog post generation...")
+
+    config = load_config()
+    tracker = load_tracker()
+    template = load_template()
+
+    # Check daily limit (2 posts per day)
+    max_daily = config.get("posts_per_day", 2)
+    today_count = posts_generated_today(tracker)
+    if today_count >= max_daily:
+        logger.info(f"Already generated {today_count}/{max_daily} posts today. Skipping.")
+        return
+
+    # Promote the next pre-generated draft if one is still valid
+    drafts = load_drafts()
+    pruned = prune_drafts(drafts, tracker, draft_fingerprint(config))
+    if len(pruned) != len(drafts):
+        save_drafts(pruned)
+    if pruned:
+        draft = pruned[0]
+        topic, post_slug, data = draft["topic"], draft["slug"], draft["data"]
+        logger.info(f"Promoting pre-generated draft: {post_slug} ({len(pruned) - 1} left in buffer)")
+    else:
+        logger.info("Draft buffer empty. Generating post live...")
+        client = get_openai_client()
+        if client is None:
+            return
+        result = write_post(client, config, tracker)
+        if result is None:
+            return
+        topic, post_slug, data = result
+
+    if not publish_post(template, tracker, topic, post_slug, data):
+        return
+
+    # Only drop the draft from the queue once it is actually published
+    if pruned:
+        save_drafts(pruned[1:])
+
     # Git commit and push
     git_commit_and_push(post_slug, data["title"])
 
     logger.info(f"Blog post generated successfully: {post_slug}")
-    logger.info(f"Internal links found: {link_count}")
     logger.info(f"Posts today: {today_count + 1}/{max_daily}")
     logger.info("=" * 60)
 
@@ -620,10 +812,15 @@ def run_scheduler(config):
     """Run the persistent scheduler that generates posts at configured times."""
     schedule_times = config.get("schedule_times", ["08:00", "18:00"])
 
+    refill_times = config.get("draft_refill_times", ["02:00", "13:00"])
+
     for t in schedule_times:
         schedule.every().day.at(t).do(generate_post)
+    for t in refill_times:
+        schedule.every().day.at(t).do(refill_drafts)
 
     logger.info(f"Blog agent started. Scheduled to run daily at: {', '.join(schedule_times)}")
+    logger.info(f"Draft buffer refills daily at: {', '.join(refill_times)}")
     logger.info(f"Posts per day limit: {config.get('posts_per_day', 2)}")
     logger.info("Press Ctrl+C to stop.")
 
@@ -639,11 +836,18 @@ def main():
     parser.add_argument(
         "--now",
         action="store_true",
-        help="Generate a post immediately instead of running the scheduler",
+        help="Publish a post immediately instead of running the scheduler",
+    )
+    parser.add_argument(
+        "--refill",
+        action="store_true",
+        help="Top up the pre-generated draft buffer and exit",
     )
     args = parser.parse_args()
 
-    if args.now:
+    if args.refill:
+        refill_drafts()
+    elif args.now:
         generate_post()
     else:
         config = load_config()